@@ -1,88 +1,141 @@
 import duckdb
+import threading
 from typing import Optional
 
 
 class DatabaseManager:
     def __init__(self, db_path: str = "reading_stats.duckdb"):
         self.db_path = db_path
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+        self._conn_lock = threading.Lock()
+        self._sqlite_loaded = False
+        self._mapping_cache: Optional[dict[str, tuple[str, Optional[str]]]] = None
         self.create_schema()
 
-    def get_connection(self):
-        """Returns a new DuckDB connection."""
-        return duckdb.connect(self.db_path)
+    def get_connection(self) -> duckdb.DuckDBPyConnection:
+        """
+        Returns a new cursor on the shared DuckDB connection.
+        The database is opened once and each cursor is an independent
+        connection to it, so cursors are cheap and safe to use per thread.
+        """
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = duckdb.connect(self.db_path)
+            return self._conn.cursor()
+
+    def close(self):
+        """Closes the shared DuckDB connection and all its cursors."""
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._sqlite_loaded = False
 
     def create_schema(self):
         """Creates the necessary database tables if they don't exist."""
         with self.get_connection() as conn:
-            # Create books table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS books (
-                    id VARCHAR PRIMARY KEY, -- MD5 hash
-                    koreader_id INTEGER,
-                    title VARCHAR,
-                    authors VARCHAR,
-                    series VARCHAR,
-                    language VARCHAR,
-                    isbn VARCHAR,
-                    total_pages INTEGER,
-                    total_read_pages INTEGER,
-                    total_read_time INTEGER,
-                    highlights INTEGER,
-                    notes INTEGER,
-                    last_open TIMESTAMP,
-                    status VARCHAR,
-                    start_date DATE,
-                    finish_date DATE,
-                    rating INTEGER,
-                    sync_status VARCHAR DEFAULT 'pending',
-                    sync_error TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # DuckDB has no user_version pragma. The unique session index is
+            # the last object created below, so if it exists the schema is
+            # up to date and the DDL can be skipped. Keep it last when adding
+            # new schema objects.
+            has_unique_index = conn.execute(
+                "SELECT 1 FROM duckdb_indexes() WHERE index_name = 'idx_reading_sessions_book_start_time'"
+            ).fetchone()
+            if has_unique_index:
+                return
 
-            # Create reading_sessions table
-            conn.execute("""
-                CREATE SEQUENCE IF NOT EXISTS seq_reading_sessions_id
-            """)
+            # Run the DDL in one transaction so a cold start commits once
+            conn.begin()
+            try:
+                # Create books table
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS books (
+                        id VARCHAR PRIMARY KEY, -- MD5 hash
+                        koreader_id INTEGER,
+                        title VARCHAR,
+                        authors VARCHAR,
+                        series VARCHAR,
+                        language VARCHAR,
+                        isbn VARCHAR,
+                        total_pages INTEGER,
+                        total_read_pages INTEGER,
+                        total_read_time INTEGER,
+                        highlights INTEGER,
+                        notes INTEGER,
+                        last_open TIMESTAMP,
+                        status VARCHAR,
+                        start_date DATE,
+                        finish_date DATE,
+                        rating INTEGER,
+                        sync_status VARCHAR DEFAULT 'pending',
+                        sync_error TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
 
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS reading_sessions (
-                    id BIGINT PRIMARY KEY DEFAULT nextval('seq_reading_sessions_id'),
-                    book_id VARCHAR,
-                    page INTEGER,
-                    start_time TIMESTAMP,
-                    duration INTEGER, -- Seconds
-                    total_pages INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                # Create reading_sessions table
+                conn.execute("""
+                    CREATE SEQUENCE IF NOT EXISTS seq_reading_sessions_id
+                """)
+
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS reading_sessions (
+                        id BIGINT PRIMARY KEY DEFAULT nextval('seq_reading_sessions_id'),
+                        book_id VARCHAR,
+                        page INTEGER,
+                        start_time TIMESTAMP,
+                        duration INTEGER, -- Seconds
+                        total_pages INTEGER,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+                # Create book_mappings table (Hardcover specific adaptation)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS book_mappings (
+                        local_book_id VARCHAR PRIMARY KEY,
+                        hardcover_id VARCHAR,
+                        edition_id VARCHAR,
+                        hardcover_slug VARCHAR,
+                        book_title VARCHAR,
+                        author VARCHAR,
+                        isbn VARCHAR,
+                        mapping_method VARCHAR,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+                # Indexes
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_books_updated_at ON books(updated_at)"
                 )
-            """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_reading_sessions_book_id ON reading_sessions(book_id)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_reading_sessions_start_time ON reading_sessions(start_time)"
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
-            # Create book_mappings table (Hardcover specific adaptation)
+            # Sessions are deduplicated on (book_id, start_time). Databases
+            # created before this index existed may hold duplicates, which
+            # have to be dropped before the unique index can be built. This
+            # runs after the commit above, as DuckDB builds the index from
+            # committed data only.
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS book_mappings (
-                    local_book_id VARCHAR PRIMARY KEY,
-                    hardcover_id VARCHAR,
-                    edition_id VARCHAR,
-                    hardcover_slug VARCHAR,
-                    book_title VARCHAR,
-                    author VARCHAR,
-                    isbn VARCHAR,
-                    mapping_method VARCHAR,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                DELETE FROM reading_sessions
+                WHERE id NOT IN (
+                    SELECT MIN(id) FROM reading_sessions
+                    GROUP BY book_id, start_time
                 )
             """)
-
-            # Indexes
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_books_updated_at ON books(updated_at)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_reading_sessions_book_id ON reading_sessions(book_id)"
-            )
             conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_reading_sessions_start_time ON reading_sessions(start_time)"
+                "CREATE UNIQUE INDEX idx_reading_sessions_book_start_time ON reading_sessions(book_id, start_time)"
             )
 
     def get_local_books(
@@ -90,7 +143,9 @@ class DatabaseManager:
     ) -> tuple[list[tuple], int]:
         """
         Fetches local books with optional search, pagination, and mapping status.
-        Returns (books, total_count).
+        Returns (books, total_count), each book being (id, title, authors,
+        last_open, is_mapped, hardcover_slug, hardcover_id, total_read_pages,
+        total_pages, sync_status).
         """
         with self.get_connection() as conn:
             # Base query
@@ -101,29 +156,51 @@ class DatabaseManager:
                 search_term = f"%{query}%"
                 params = [search_term, search_term]
 
-            # Get total count first
-            count_query = f"SELECT COUNT(*) FROM books b {where_clause}"
-            total = conn.execute(count_query, params).fetchone()[0]
-
             # Get paginated results with mapping status
-            # We perform a LEFT JOIN on book_mappings to check if it's already mapped
+            # The page is cut from books first (MATERIALIZED keeps DuckDB from
+            # inlining the CTE), so the LEFT JOIN on book_mappings to check if
+            # a book is already mapped only runs on `limit` rows
             sql = f"""
+                WITH page AS MATERIALIZED (
+                    SELECT
+                        b.id, b.title, b.authors, b.last_open,
+                        b.total_read_pages, b.total_pages, b.sync_status,
+                        COUNT(*) OVER () as total_count
+                    FROM books b
+                    {where_clause}
+                    ORDER BY b.last_open DESC NULLS LAST, b.id
+                    LIMIT ? OFFSET ?
+                )
                 SELECT 
-                    b.id,
-                    b.title,
-                    b.authors,
-                    b.last_open,
+                    p.id,
+                    p.title,
+                    p.authors,
+                    p.last_open,
                     CASE WHEN m.local_book_id IS NOT NULL THEN 1 ELSE 0 END as is_mapped,
                     m.hardcover_slug,
-                    m.hardcover_id
-                FROM books b
-                LEFT JOIN book_mappings m ON b.id = m.local_book_id
-                {where_clause}
-                ORDER BY b.last_open DESC NULLS LAST
-                LIMIT ? OFFSET ?
+                    m.hardcover_id,
+                    p.total_read_pages,
+                    p.total_pages,
+                    p.sync_status,
+                    p.total_count
+                FROM page p
+                LEFT JOIN book_mappings m ON p.id = m.local_book_id
+                ORDER BY p.last_open DESC NULLS LAST, p.id
             """
 
-            books = conn.execute(sql, params + [limit, offset]).fetchall()
+            rows = conn.execute(sql, params + [limit, offset]).fetchall()
+
+            # The window count is evaluated before LIMIT, so any row carries
+            # the total. Only a page past the end needs a separate count.
+            if rows:
+                total = rows[0][-1]
+            elif offset > 0:
+                count_query = f"SELECT COUNT(*) FROM books b {where_clause}"
+                total = conn.execute(count_query, params).fetchone()[0]
+            else:
+                total = 0
+
+            books = [row[:-1] for row in rows]
             return books, total
 
     def import_books(self, sqlite_path: str):
@@ -131,68 +208,7 @@ class DatabaseManager:
         with self.get_connection() as conn:
             self._attach_koreader(conn, sqlite_path)
             try:
-                # 1. Update existing books
-                conn.execute("""
-                    UPDATE books
-                    SET
-                        koreader_id = k.id,
-                        title = k.title,
-                        authors = k.authors,
-                        series = k.series,
-                        language = k.language,
-                        total_pages = k.pages,
-                        total_read_pages = k.total_read_pages,
-                        total_read_time = k.total_read_time,
-                        highlights = k.highlights,
-                        notes = k.notes,
-                        last_open = to_timestamp(k.last_open),
-                        status = CASE 
-                            WHEN k.pages > 0 AND (
-                                (CAST(k.total_read_pages AS FLOAT) / CAST(pages AS FLOAT)) >= 0.98 OR
-                                (k.pages - k.total_read_pages) <= 15
-                            ) THEN 'finished'
-                            ELSE 'reading'
-                        END,
-                        updated_at = now()
-                    FROM koreader.book k
-                    WHERE books.id = k.md5
-                    AND k.md5 IS NOT NULL AND k.md5 != ''
-                """)
-
-                # 2. Insert new books
-                conn.execute("""
-                    INSERT INTO books (
-                        id, koreader_id, title, authors, series, language, 
-                        total_pages, total_read_pages, total_read_time, highlights, notes,
-                        last_open, status, sync_status, created_at, updated_at
-                    )
-                    SELECT 
-                        k.md5,
-                        k.id,
-                        k.title,
-                        k.authors,
-                        k.series,
-                        k.language,
-                        k.pages,
-                        k.total_read_pages,
-                        k.total_read_time,
-                        k.highlights,
-                        k.notes,
-                        to_timestamp(k.last_open),
-                        CASE 
-                            WHEN k.pages > 0 AND (
-                                (CAST(k.total_read_pages AS FLOAT) / CAST(k.pages AS FLOAT)) >= 0.98 OR
-                                (k.pages - k.total_read_pages) <= 15
-                            ) THEN 'finished'
-                            ELSE 'reading'
-                        END,
-                        'pending',
-                        now(),
-                        now()
-                    FROM koreader.book k
-                    WHERE k.md5 IS NOT NULL AND k.md5 != ''
-                    AND NOT EXISTS (SELECT 1 FROM books b WHERE b.id = k.md5)
-                """)
+                self._upsert_books(conn)
             finally:
                 self._detach_koreader(conn)
 
@@ -201,36 +217,141 @@ class DatabaseManager:
         with self.get_connection() as conn:
             self._attach_koreader(conn, sqlite_path)
             try:
-                conn.execute("""
-                    INSERT INTO reading_sessions (
-                        book_id, page, start_time, duration, total_pages
-                    )
-                    SELECT 
-                        b.md5 as book_id,
-                        psd.page,
-                        to_timestamp(psd.start_time) as start_time,
-                        psd.duration,
-                        psd.total_pages
-                    FROM koreader.page_stat_data psd
-                    JOIN koreader.book b ON psd.id_book = b.id
-                    WHERE b.md5 IS NOT NULL AND b.md5 != ''
-                    AND NOT EXISTS (
-                        SELECT 1 FROM reading_sessions rs 
-                        WHERE rs.book_id = b.md5 
-                        AND rs.start_time = to_timestamp(psd.start_time)
-                    )
-                """)
+                self._insert_sessions(conn)
             finally:
                 self._detach_koreader(conn)
 
+    def import_all(self, sqlite_path: str):
+        """
+        Imports books and reading sessions from a KOReader SQLite database.
+        Attaches the file once and writes both tables in a single transaction.
+        """
+        with self.get_connection() as conn:
+            self._attach_koreader(conn, sqlite_path)
+            try:
+                conn.begin()
+                try:
+                    self._upsert_books(conn)
+                    self._insert_sessions(conn)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                self._detach_koreader(conn)
+
+    def _upsert_books(self, conn):
+        """Upserts the attached koreader.book rows into books."""
+        # Upsert in a single statement so koreader.book is only scanned once;
+        # created_at is preserved for books we already know, and sync_status
+        # unless their progress changed.
+        # KOReader bumps last_open whenever it writes a book's statistics, so
+        # known books only need updating if they were opened since the newest
+        # one we imported. Unknown books are always inserted.
+        conn.execute("""
+            INSERT INTO books (
+                id, koreader_id, title, authors, series, language, 
+                total_pages, total_read_pages, total_read_time, highlights, notes,
+                last_open, status, sync_status, created_at, updated_at
+            )
+            SELECT 
+                k.md5,
+                k.id,
+                k.title,
+                k.authors,
+                k.series,
+                k.language,
+                k.pages,
+                k.total_read_pages,
+                k.total_read_time,
+                k.highlights,
+                k.notes,
+                to_timestamp(k.last_open),
+                -- Finished at >= 98% read (compared in integer math) or
+                -- with at most 15 pages left
+                CASE 
+                    WHEN k.pages > 0 AND (
+                        k.total_read_pages * 100 >= k.pages * 98 OR
+                        (k.pages - k.total_read_pages) <= 15
+                    ) THEN 'finished'
+                    ELSE 'reading'
+                END,
+                'pending',
+                now(),
+                now()
+            FROM koreader.book k
+            WHERE k.md5 IS NOT NULL AND k.md5 != ''
+            AND (
+                to_timestamp(k.last_open) >= (
+                    SELECT coalesce(max(last_open), TIMESTAMP '1970-01-01') FROM books
+                )
+                OR k.md5 NOT IN (SELECT id FROM books)
+            )
+            ON CONFLICT (id) DO UPDATE SET
+                koreader_id = excluded.koreader_id,
+                title = excluded.title,
+                authors = excluded.authors,
+                series = excluded.series,
+                language = excluded.language,
+                total_pages = excluded.total_pages,
+                total_read_pages = excluded.total_read_pages,
+                total_read_time = excluded.total_read_time,
+                highlights = excluded.highlights,
+                notes = excluded.notes,
+                last_open = excluded.last_open,
+                status = excluded.status,
+                -- Progress changed since the last sync: sync it again
+                sync_status = CASE
+                    WHEN books.last_open IS DISTINCT FROM excluded.last_open
+                        OR books.total_pages IS DISTINCT FROM excluded.total_pages
+                        OR books.total_read_pages IS DISTINCT FROM excluded.total_read_pages
+                        OR books.total_read_time IS DISTINCT FROM excluded.total_read_time
+                    THEN 'pending'
+                    ELSE books.sync_status
+                END,
+                updated_at = now()
+        """)
+
+    def _insert_sessions(self, conn):
+        """Inserts the attached koreader.page_stat_data rows into reading_sessions."""
+        # Sessions we already have are skipped by the unique
+        # (book_id, start_time) index instead of an existence check.
+        conn.execute("""
+            INSERT INTO reading_sessions (
+                book_id, page, start_time, duration, total_pages
+            )
+            SELECT 
+                b.md5 as book_id,
+                psd.page,
+                to_timestamp(psd.start_time) as start_time,
+                psd.duration,
+                psd.total_pages
+            FROM koreader.page_stat_data psd
+            JOIN koreader.book b ON psd.id_book = b.id
+            WHERE b.md5 IS NOT NULL AND b.md5 != ''
+            ON CONFLICT (book_id, start_time) DO NOTHING
+        """)
+
     def _attach_koreader(self, conn, sqlite_path: str):
+        # Extensions are loaded per database instance, which lives as long as
+        # the shared connection, so INSTALL/LOAD only has to run once.
+        if not self._sqlite_loaded:
+            try:
+                # INSTALL is only needed the very first time on this machine
+                installed, loaded = conn.execute(
+                    "SELECT installed, loaded FROM duckdb_extensions() WHERE extension_name = 'sqlite_scanner'"
+                ).fetchone() or (False, False)
+                if not installed:
+                    conn.execute("INSTALL sqlite;")
+                if not loaded:
+                    conn.execute("LOAD sqlite;")
+                self._sqlite_loaded = True
+            except Exception:
+                pass
+        # ATTACH does not accept bound parameters, so escape the path literal
+        quoted_path = sqlite_path.replace("'", "''")
         try:
-            conn.execute("INSTALL sqlite;")
-            conn.execute("LOAD sqlite;")
-        except Exception:
-            pass
-        try:
-            conn.execute(f"ATTACH '{sqlite_path}' AS koreader (TYPE SQLITE)")
+            conn.execute(f"ATTACH '{quoted_path}' AS koreader (TYPE SQLITE, READ_ONLY)")
         except Exception as e:
             raise RuntimeError(
                 f"Failed to attach SQLite database at {sqlite_path}: {e}"
@@ -244,12 +365,19 @@ class DatabaseManager:
 
     def get_book_mapping(self, local_id: str) -> Optional[tuple[str, Optional[str]]]:
         """Returns the (hardcover_id, edition_id) for a given local book ID (MD5)."""
-        with self.get_connection() as conn:
-            row = conn.execute(
-                "SELECT hardcover_id, edition_id FROM book_mappings WHERE local_book_id = ?",
-                [local_id],
-            ).fetchone()
-            return (row[0], row[1]) if row else None
+        return self._get_mapping_cache().get(local_id)
+
+    def _get_mapping_cache(self) -> dict[str, tuple[str, Optional[str]]]:
+        """Loads all mappings in one query and keeps them until the next save."""
+        mapping_cache = self._mapping_cache
+        if mapping_cache is None:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    "SELECT local_book_id, hardcover_id, edition_id FROM book_mappings"
+                ).fetchall()
+            mapping_cache = {row[0]: (row[1], row[2]) for row in rows}
+            self._mapping_cache = mapping_cache
+        return mapping_cache
 
     def save_book_mapping(
         self,
@@ -261,11 +389,27 @@ class DatabaseManager:
         slug: str = None,
     ):
         """Saves a mapping between a local book and Hardcover."""
+        self.save_book_mappings(
+            [(local_id, hardcover_id, edition_id, title, author, slug)]
+        )
+
+    def save_book_mappings(self, rows: list[tuple]):
+        """
+        Saves several mappings in a single upsert statement.
+        Each row is (local_id, hardcover_id, edition_id, title, author, slug);
+        if a local_id occurs more than once, the last row wins.
+        """
+        rows = list({row[0]: row for row in rows}.values())
+        if not rows:
+            return
+
+        placeholders = ", ".join(["(?, ?, ?, ?, ?, ?, 'manual')"] * len(rows))
+        params = [value for row in rows for value in row]
         with self.get_connection() as conn:
             conn.execute(
-                """
+                f"""
                 INSERT INTO book_mappings (local_book_id, hardcover_id, edition_id, book_title, author, hardcover_slug, mapping_method)
-                VALUES (?, ?, ?, ?, ?, ?, 'manual')
+                VALUES {placeholders}
                 ON CONFLICT (local_book_id) DO UPDATE SET
                     hardcover_id = excluded.hardcover_id,
                     edition_id = excluded.edition_id,
@@ -274,5 +418,11 @@ class DatabaseManager:
                     hardcover_slug = excluded.hardcover_slug,
                     updated_at = now()
             """,
-                [local_id, hardcover_id, edition_id, title, author, slug],
+                params,
+            )
+            # A (re)mapped book has to be synced to its new Hardcover entry
+            conn.execute(
+                "UPDATE books SET sync_status = 'pending' WHERE id = ANY(?)",
+                [[row[0] for row in rows]],
             )
+        self._mapping_cache = None
@@ -2,15 +2,22 @@ import os
 import tempfile
 import logging
 import math
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Optional
 from koreadertohardcover.database import DatabaseManager
 from koreadertohardcover.config import Config
-from koreadertohardcover.webdav_client import fetch_koreader_db
+from koreadertohardcover.webdav_client import (
+    fetch_koreader_db,
+    get_koreader_db_version,
+)
 from koreadertohardcover.hardcover_client import HardcoverClient
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Number of books synced to Hardcover concurrently
+SYNC_WORKERS = 4
+
 
 class SyncEngine:
     def __init__(
@@ -19,6 +26,9 @@ class SyncEngine:
         self.db_path = db_path
         self.db = DatabaseManager(db_path)
         self.config = config or Config()
+        # Version of the WebDAV file last ingested, so a long-running process
+        # (the dashboard scheduler) skips downloading an unchanged database
+        self._webdav_version = None
 
     def ingest_from_webdav(self) -> bool:
         """
@@ -29,6 +39,16 @@ class SyncEngine:
             logger.error("WEBDAV_URL is not set.")
             return False
 
+        try:
+            version = get_koreader_db_version(self.config)
+        except Exception as e:
+            logger.warning(f"Could not check WebDAV file, downloading anyway: {e}")
+            version = None
+
+        if version is not None and version == self._webdav_version:
+            logger.info("KOReader database unchanged on WebDAV, skipping download.")
+            return True
+
         # Create a temp file to download the database to
         tmp_fd, tmp_path = tempfile.mkstemp(suffix=".sqlite3")
         os.close(tmp_fd)
@@ -39,8 +59,8 @@ class SyncEngine:
 
             logger.info("Ingesting data from fetched SQLite DB...")
             # self.db.connect()  <- Removed
-            self.db.import_books(tmp_path)
-            self.db.import_sessions(tmp_path)
+            self.db.import_all(tmp_path)
+            self._webdav_version = version
             logger.info("Ingestion complete.")
             return True
         except Exception as e:
@@ -64,8 +84,7 @@ class SyncEngine:
         try:
             logger.info(f"Ingesting data from local file: {sqlite_path}...")
             # self.db.connect() <- Removed
-            self.db.import_books(sqlite_path)
-            self.db.import_sessions(sqlite_path)
+            self.db.import_all(sqlite_path)
             logger.info("Ingestion complete.")
             return True
         except Exception as e:
@@ -92,26 +111,57 @@ class SyncEngine:
 
             with self.db.get_connection() as conn:
                 # Fetch recent books that are mapped
-                # We select books, verify they have a mapping, and then sync
+                # We select books, verify they have a mapping, and then sync.
+                # Several local copies can map to the same Hardcover book;
+                # only the most recently opened one is kept, before the
+                # sync_status filter, so an older pending copy never
+                # overwrites newer progress. This also keeps parallel workers
+                # from racing on the same UserBook.
+                # Session stats are aggregated in one pass, only for the
+                # selected books.
                 sql = """
+                    WITH recent AS (
+                        SELECT 
+                            b.id, b.title, b.authors, b.total_read_pages, b.total_pages, 
+                            b.status, b.total_read_time, b.last_open,
+                            m.hardcover_id, m.edition_id, b.sync_status
+                        FROM books b
+                        JOIN book_mappings m ON b.id = m.local_book_id
+                        QUALIFY ROW_NUMBER() OVER (
+                            PARTITION BY m.hardcover_id ORDER BY b.last_open DESC
+                        ) = 1
+                        ORDER BY b.last_open DESC
+                        LIMIT ?
+                    ),
+                    session_stats AS (
+                        SELECT
+                            book_id,
+                            MIN(start_time) as start_date,
+                            MAX(start_time) as last_session_date,
+                            MAX(page) as max_page
+                        FROM reading_sessions
+                        WHERE book_id IN (SELECT id FROM recent)
+                        GROUP BY book_id
+                    )
                     SELECT 
-                        b.id, b.title, b.authors, b.total_read_pages, b.total_pages, 
-                        b.status, b.total_read_time, b.last_open,
-                        m.hardcover_id, m.edition_id,
-                        (SELECT MIN(start_time) FROM reading_sessions rs WHERE rs.book_id = b.id) as start_date,
-                        (SELECT MAX(start_time) FROM reading_sessions rs WHERE rs.book_id = b.id) as last_session_date,
-                        (SELECT MAX(page) FROM reading_sessions rs WHERE rs.book_id = b.id) as max_page
-                    FROM books b
-                    JOIN book_mappings m ON b.id = m.local_book_id
-                    ORDER BY b.last_open DESC
-                    LIMIT ?
+                        r.id, r.title, r.authors, r.total_read_pages, r.total_pages, 
+                        r.status, r.total_read_time, r.last_open,
+                        r.hardcover_id, r.edition_id,
+                        s.start_date, s.last_session_date, s.max_page
+                    FROM recent r
+                    LEFT JOIN session_stats s ON s.book_id = r.id
+                    -- Books already synced are skipped unless forced, as
+                    -- ingestion resets sync_status when progress changes
+                    WHERE ? OR r.sync_status IS DISTINCT FROM 'synced'
+                    ORDER BY r.last_open DESC
                 """
 
-                recent_books = conn.execute(sql, [limit]).fetchall()
+                recent_books = conn.execute(sql, [limit, force]).fetchall()
                 logger.info(
                     f"Found {len(recent_books)} mapped books to check for sync."
                 )
 
+                jobs = []
                 for (
                     b_id,
                     title,
@@ -149,26 +199,58 @@ class SyncEngine:
                         last_session_date if last_session_date else last_open
                     )
 
-                    success = hc.update_progress(
-                        hc_id,
-                        percentage,
-                        status,
-                        seconds=read_time,
-                        last_read_date=effective_last_read,
-                        start_date=start_date,
-                        force=force,
-                        edition_id=edition_id,
+                    jobs.append(
+                        (
+                            b_id,
+                            title,
+                            (hc_id, percentage, status),
+                            {
+                                "seconds": read_time,
+                                "last_read_date": effective_last_read,
+                                "start_date": start_date,
+                                "force": force,
+                                "edition_id": edition_id,
+                            },
+                        )
                     )
 
-                    if success:
-                        conn.execute(
-                            "UPDATE books SET sync_status = 'synced', updated_at = now() WHERE id = ?",
-                            [b_id],
+                # Each book is a handful of sequential GraphQL round-trips, so
+                # books are synced in parallel. The shared httpx client is
+                # thread-safe; the pool stays small to respect rate limits.
+                with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+                    futures = [
+                        (
+                            b_id,
+                            title,
+                            executor.submit(hc.update_progress, *args, **kwargs),
                         )
+                        for b_id, title, args, kwargs in jobs
+                    ]
+
+                    synced_ids = []
+                    for b_id, title, future in futures:
+                        # One failing book must not lose the results of the
+                        # others, which Hardcover has already accepted
+                        try:
+                            success = future.result()
+                        except Exception as e:
+                            logger.error(f"Error syncing '{title}': {e}")
+                            success = False
+                        if success:
+                            synced_ids.append(b_id)
 
-                    results.append((title, success))
+                        results.append((title, success))
+
+                # Mark all successfully synced books in a single statement
+                if synced_ids:
+                    conn.execute(
+                        "UPDATE books SET sync_status = 'synced', updated_at = now() WHERE id = ANY(?)",
+                        [synced_ids],
+                    )
 
         except Exception as e:
             logger.error(f"Error during sync: {e}")
+        finally:
+            hc.close()
 
         return results
@@ -1,14 +1,43 @@
+import functools
 import httpx
 import logging
 import math
-from typing import List, Dict, Any, Optional
+import random
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from koreadertohardcover.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Hardcover user_book status ids; anything not listed is treated as finished.
+_STATUS_IDS = {"reading": 2, "finished": 3}
+
+# Editions are public catalog data, so each client caches them per book id.
+# The web dashboard shares one client, so the cache spans its requests.
+EDITIONS_CACHE_TTL = 3600
+
+
+@functools.lru_cache(maxsize=None)
+def _compact_query(query: str) -> str:
+    """
+    Collapses the indentation and newlines of an inline GraphQL document.
+    Whitespace is insignificant in our queries (no string literals), so the
+    queries can stay readable in the source while sending fewer bytes.
+    """
+    return " ".join(query.split())
+
 
 class HardcoverClient:
     API_URL = "https://api.hardcover.app/v1/graphql"
+    # Hardcover allows 60 requests per minute. Short bursts are fine, as long
+    # as the average stays under the limit.
+    RATE_LIMIT_PER_SECOND = 1.0
+    RATE_LIMIT_BURST = 10
+    MAX_RETRIES = 3
+    # Upper bound for a single retry wait, so a huge Retry-After cannot hold
+    # a sync worker (and the sync lock) for long
+    MAX_RETRY_DELAY = 30
 
     def __init__(self, config: Config):
         self.config = config
@@ -21,25 +50,80 @@ class HardcoverClient:
             "User-Agent": "curl/7.64.1",
         }
 
+        # One client for all queries, so the TCP/TLS connection is kept alive
+        # across the several round-trips each sync makes.
+        self._client = httpx.Client(timeout=30.0, headers=self.headers)
+
+        # Token bucket shared by all threads using this client
+        self._rate_lock = threading.Lock()
+        self._tokens = float(self.RATE_LIMIT_BURST)
+        self._last_refill = time.monotonic()
+
+        # book_id -> (fetched_at, editions), see EDITIONS_CACHE_TTL
+        self._editions_cache: Dict[int, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._editions_cache_lock = threading.Lock()
+
+    def close(self):
+        """Closes the underlying HTTP connection pool."""
+        self._client.close()
+
+    def __enter__(self) -> "HardcoverClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _wait_for_rate_limit(self):
+        """Blocks until a request token is available."""
+        with self._rate_lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.RATE_LIMIT_BURST,
+                self._tokens + (now - self._last_refill) * self.RATE_LIMIT_PER_SECOND,
+            )
+            self._last_refill = now
+            # Going negative reserves a future token, so waiters queue up fairly
+            self._tokens -= 1
+            wait = -self._tokens / self.RATE_LIMIT_PER_SECOND
+        if wait > 0:
+            time.sleep(wait)
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying a 429, honoring Retry-After."""
+        try:
+            delay = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            delay = 2**attempt
+        delay = max(0.0, min(delay, self.MAX_RETRY_DELAY))
+        return delay + random.uniform(0, 0.25)
+
     def _execute_query(
         self, query: str, variables: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        with httpx.Client(timeout=30.0) as client:
-            try:
-                response = client.post(
+        try:
+            for attempt in range(self.MAX_RETRIES + 1):
+                self._wait_for_rate_limit()
+                response = self._client.post(
                     self.API_URL,
-                    json={"query": query, "variables": variables or {}},
-                    headers=self.headers,
+                    json={"query": _compact_query(query), "variables": variables or {}},
+                )
+                if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                    break
+                delay = self._retry_delay(response, attempt)
+                logger.warning(
+                    f"Rate limited by Hardcover, retrying in {delay:.1f}s..."
                 )
-                response.raise_for_status()
-                data = response.json()
-                if "errors" in data:
-                    raise RuntimeError(f"GraphQL Error: {data['errors']}")
-                return data["data"]
-            except httpx.HTTPStatusError as e:
-                print(f"HTTP Error: {e.response.status_code}")
-                print(f"Response: {e.response.text}")
-                raise e
+                time.sleep(delay)
+            response.raise_for_status()
+            data = response.json()
+            if "errors" in data:
+                raise RuntimeError(f"GraphQL Error: {data['errors']}")
+            return data["data"]
+        except httpx.HTTPStatusError as e:
+            logger.error(
+                f"HTTP Error: {e.response.status_code} - Response: {e.response.text}"
+            )
+            raise e
 
     def get_me(self) -> Dict[str, Any]:
         """Fetches the authenticated user's information."""
@@ -91,7 +175,12 @@ class HardcoverClient:
         return results
 
     def get_editions(self, book_id: int) -> List[Dict[str, Any]]:
-        """Fetches editions for a given book ID."""
+        """Fetches editions for a given book ID, cached for EDITIONS_CACHE_TTL."""
+        with self._editions_cache_lock:
+            cached = self._editions_cache.get(book_id)
+        if cached and time.monotonic() - cached[0] < EDITIONS_CACHE_TTL:
+            return list(cached[1])
+
         gql = """
         query GetEditions($book_id: Int!) {
           editions(where: {book_id: {_eq: $book_id}}, order_by: {release_date: desc}) {
@@ -122,7 +211,17 @@ class HardcoverClient:
                     "language": language,
                 }
             )
-        return results
+
+        now = time.monotonic()
+        with self._editions_cache_lock:
+            # Drop expired entries so a long-lived client does not grow forever
+            self._editions_cache = {
+                key: entry
+                for key, entry in self._editions_cache.items()
+                if now - entry[0] < EDITIONS_CACHE_TTL
+            }
+            self._editions_cache[book_id] = (now, results)
+        return list(results)
 
     def is_book_on_shelf(self, book_id: int) -> bool:
         """Checks if a book ID is already on the user's shelf."""
@@ -144,8 +243,8 @@ class HardcoverClient:
     def search_shelf(self, title: str) -> List[Dict[str, Any]]:
         """
         Searches the user's shelf for a book by title.
-        First tries an exact API match. If that fails, fetches user's books
-        and performs a local case-insensitive search.
+        First tries an exact API match. If that fails, retries with a
+        case-insensitive match evaluated by the API.
         """
         # 1. Try exact API match
         gql = """
@@ -168,36 +267,20 @@ class HardcoverClient:
         }
         """
         data = self._execute_query(gql, {"title": title})
-
-        results = []
-        me_data = data.get("me")
-        if me_data and len(me_data) > 0:
-            for ub in me_data[0].get("user_books", []):
-                book = ub["book"]
-                author_name = "Unknown"
-                if book.get("contributions"):
-                    author_name = book["contributions"][0]["author"]["name"]
-
-                results.append(
-                    {
-                        "id": book["id"],
-                        "title": book["title"],
-                        "slug": book.get("slug"),
-                        "author_name": author_name,
-                        "pages": book.get("pages"),
-                    }
-                )
+        results = self._parse_shelf_books(data)
 
         if results:
             return results
 
-        # 2. Fallback: Fetch all books and search locally
-        print(f"  Exact match failed. Fetching shelf to search for '{title}'...")
-        # Note: Limit 50 most recently updated books to find current reads
-        gql_all = """
-        query GetAllUserBooks {
+        # 2. Fallback: case-insensitive match, filtered server-side so only
+        # matching books are returned. LIKE wildcards in the title are escaped.
+        logger.info(
+            f"Exact match failed. Searching shelf case-insensitively for '{title}'..."
+        )
+        gql_ilike = """
+        query SearchShelfInsensitive($title: String!) {
           me {
-            user_books(limit: 50, order_by: {updated_at: desc}) {
+            user_books(where: {book: {title: {_ilike: $title}}}, limit: 5) {
               book {
                 id
                 title
@@ -213,33 +296,34 @@ class HardcoverClient:
           }
         }
         """
-        data_all = self._execute_query(gql_all)
-        me_all = data_all.get("me", [])
-
-        if not me_all:
-            return []
-
-        search_term = title.lower().strip()
+        pattern = (
+            title.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        data_ilike = self._execute_query(gql_ilike, {"title": pattern})
+        return self._parse_shelf_books(data_ilike)
+
+    def _parse_shelf_books(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Flattens a me.user_books.book response into search results."""
+        results = []
+        me_data = data.get("me")
+        if not me_data:
+            return results
 
-        for ub in me_all[0].get("user_books", []):
+        for ub in me_data[0].get("user_books", []):
             book = ub["book"]
-            book_title = book["title"]
+            author_name = "Unknown"
+            if book.get("contributions"):
+                author_name = book["contributions"][0]["author"]["name"]
 
-            # Check for case-insensitive match
-            if book_title.lower().strip() == search_term:
-                author_name = "Unknown"
-                if book.get("contributions"):
-                    author_name = book["contributions"][0]["author"]["name"]
-
-                results.append(
-                    {
-                        "id": book["id"],
-                        "title": book_title,
-                        "slug": book.get("slug"),
-                        "author_name": author_name,
-                        "pages": book.get("pages"),
-                    }
-                )
+            results.append(
+                {
+                    "id": book["id"],
+                    "title": book["title"],
+                    "slug": book.get("slug"),
+                    "author_name": author_name,
+                    "pages": book.get("pages"),
+                }
+            )
 
         return results
 
@@ -257,34 +341,31 @@ class HardcoverClient:
         """
         Updates the progress of a book on Hardcover.
         """
-        status_id = 2 if status == "reading" else 3
+        status_id = _STATUS_IDS.get(status, 3)
         b_id = int(book_id)
         e_id = int(edition_id) if edition_id else None
+        # Hardcover dates are plain YYYY-MM-DD strings.
+        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
+        finish_str = (
+            last_read_date.strftime("%Y-%m-%d")
+            if (status == "finished" and last_read_date)
+            else None
+        )
 
         try:
-            # 1. Get Book/Edition total pages
-            logger.info(f"Fetching page count for Book ID {b_id} (Edition: {e_id})...")
-            total_pages = None
-            if e_id:
-                edition_gql = "query GetEditionPages($id: Int!) { editions_by_pk(id: $id) { pages } }"
-                ed_res = self._execute_query(edition_gql, {"id": e_id})
-                if ed_res.get("editions_by_pk"):
-                    total_pages = ed_res["editions_by_pk"].get("pages")
-
-            if not total_pages:
-                book_gql = (
-                    "query GetBookPages($id: Int!) { books_by_pk(id: $id) { pages } }"
-                )
-                bk_res = self._execute_query(book_gql, {"id": b_id})
-                if bk_res.get("books_by_pk"):
-                    total_pages = bk_res["books_by_pk"].get("pages")
-
-            logger.info(f"Found total pages: {total_pages}")
-
-            # 2. Get UserBook info
-            logger.info("Checking existing UserBook status on Hardcover...")
-            ub_gql = """
-            query GetUserBookInfo($book_id: Int!) {
+            # 1. Get Book/Edition total pages and UserBook info in one round-trip.
+            # editions_by_pk needs a non-null id; 0 matches no edition.
+            logger.info(
+                f"Fetching page count and UserBook status for Book ID {b_id} (Edition: {e_id})..."
+            )
+            info_gql = """
+            query GetUserBookInfo($book_id: Int!, $edition_id: Int!) {
+              edition: editions_by_pk(id: $edition_id) {
+                pages
+              }
+              book: books_by_pk(id: $book_id) {
+                pages
+              }
               me {
                 user_books(where: {book_id: {_eq: $book_id}}) {
                   id
@@ -301,7 +382,17 @@ class HardcoverClient:
               }
             }
             """
-            info = self._execute_query(ub_gql, {"book_id": b_id})
+            info = self._execute_query(
+                info_gql, {"book_id": b_id, "edition_id": e_id or 0}
+            )
+
+            total_pages = None
+            if e_id and info.get("edition"):
+                total_pages = info["edition"].get("pages")
+            if not total_pages and info.get("book"):
+                total_pages = info["book"].get("pages")
+
+            logger.info(f"Found total pages: {total_pages}")
 
             me_data = info.get("me", [])
             user_book = None
@@ -325,17 +416,13 @@ class HardcoverClient:
                 )
                 return True
 
-            current_page = None
-            current_seconds = None
-            current_start = None
-            current_finish = None
-            if user_book:
-                ubr_list = user_book.get("user_book_reads", [])
-                if ubr_list:
-                    current_page = ubr_list[0].get("progress_pages")
-                    current_seconds = ubr_list[0].get("progress_seconds")
-                    current_start = ubr_list[0].get("started_at")
-                    current_finish = ubr_list[0].get("finished_at")
+            # Latest reading session, or {} when there is none yet
+            ubr_list = user_book.get("user_book_reads") if user_book else None
+            latest_read = ubr_list[0] if ubr_list else {}
+            current_page = latest_read.get("progress_pages")
+            current_seconds = latest_read.get("progress_seconds")
+            current_start = latest_read.get("started_at")
+            current_finish = latest_read.get("finished_at")
 
             if user_book:
                 status_map = {1: "Want to Read", 2: "Currently Reading", 3: "Finished"}
@@ -370,16 +457,9 @@ class HardcoverClient:
                 )  # Allow 1 min drift
 
                 # Date matches (comparing string YYYY-MM-DD)
-                target_start = start_date.strftime("%Y-%m-%d") if start_date else None
-                target_finish = (
-                    last_read_date.strftime("%Y-%m-%d")
-                    if (status == "finished" and last_read_date)
-                    else None
-                )
-
-                start_match = current_start == target_start
+                start_match = current_start == start_str
                 finish_match = (
-                    (current_finish == target_finish) if status == "finished" else True
+                    (current_finish == finish_str) if status == "finished" else True
                 )
 
                 if page_match and time_match and start_match and finish_match:
@@ -424,8 +504,7 @@ class HardcoverClient:
                 current_edition = e_id
             else:
                 ub_id = user_book["id"]
-                ubr_list = user_book.get("user_book_reads", [])
-                ubr_id = ubr_list[0]["id"] if ubr_list else None
+                ubr_id = latest_read.get("id")
 
             # 3. If no UserBookRead, create it
             if not ubr_id:
@@ -440,10 +519,22 @@ class HardcoverClient:
                 res = self._execute_query(create_ubr_gql, {"ub_id": ub_id})
                 ubr_id = res["insert_user_book_read"]["id"]
 
-            # 4. Update Progress (Pages & Seconds & Dates)
+            # 4. Update Progress (Pages & Seconds & Dates), and
+            # 5. Status and Edition (if changed) in the same request.
+            # If local edition is None, use the current Hardcover edition (preserve it)
+            target_edition_id = e_id if e_id is not None else current_edition
+            update_ub = (
+                current_status != status_id or current_edition != target_edition_id
+            )
+
             logger.info(
                 f"Updating reading progress to Page {target_page if total_pages else current_page}..."
             )
+            if update_ub:
+                logger.info(
+                    f"Updating status to '{status_id}' and edition to '{target_edition_id}'..."
+                )
+
             update_ubr_gql = """
             mutation UpdateUBR($ubr_id: Int!, $pages: Int, $seconds: Int, $started_at: date, $finished_at: date) {
               update_user_book_read(id: $ubr_id, object: {
@@ -456,53 +547,46 @@ class HardcoverClient:
               }
             }
             """
+            # Hasura runs the root fields of one mutation in order, in a
+            # single transaction
+            update_ubr_and_ub_gql = """
+            mutation UpdateUBRAndUB($ubr_id: Int!, $pages: Int, $seconds: Int, $started_at: date, $finished_at: date, $ub_id: Int!, $status_id: Int!, $edition_id: Int) {
+              update_user_book_read(id: $ubr_id, object: {
+                progress_pages: $pages, 
+                progress_seconds: $seconds, 
+                started_at: $started_at,
+                finished_at: $finished_at
+              }) {
+                id
+              }
+              update_user_book(id: $ub_id, object: {status_id: $status_id, edition_id: $edition_id}) {
+                id
+              }
+            }
+            """
 
-            finished_at_str = None
-            if status == "finished" and last_read_date:
-                finished_at_str = last_read_date.strftime("%Y-%m-%d")
-
-            started_at_str = (
-                start_date.strftime("%Y-%m-%d") if start_date else current_start
-            )
-
-            self._execute_query(
-                update_ubr_gql,
-                {
-                    "ubr_id": ubr_id,
-                    "pages": target_page if total_pages else current_page,
-                    "seconds": seconds,
-                    "started_at": started_at_str,
-                    "finished_at": finished_at_str,
-                },
-            )
-            logger.info("Progress update successful.")
-
-            # 6. Update Status and Edition (if changed)
-            # If local edition is None, use the current Hardcover edition (preserve it)
-            target_edition_id = e_id if e_id is not None else current_edition
-
-            if current_status != status_id or current_edition != target_edition_id:
-                logger.info(
-                    f"Updating status to '{status_id}' and edition to '{target_edition_id}'..."
-                )
-                update_ub_gql = """
-                mutation UpdateUB($ub_id: Int!, $status_id: Int!, $edition_id: Int) {
-                  update_user_book(id: $ub_id, object: {status_id: $status_id, edition_id: $edition_id}) {
-                    id
-                  }
-                }
-                """
-                self._execute_query(
-                    update_ub_gql,
+            update_vars = {
+                "ubr_id": ubr_id,
+                "pages": target_page if total_pages else current_page,
+                "seconds": seconds,
+                "started_at": start_str or current_start,
+                "finished_at": finish_str,
+            }
+            if update_ub:
+                update_vars.update(
                     {
                         "ub_id": ub_id,
                         "status_id": status_id,
                         "edition_id": target_edition_id,
-                    },
+                    }
                 )
-                logger.info("Status and edition update successful.")
+                self._execute_query(update_ubr_and_ub_gql, update_vars)
+                logger.info("Progress, status and edition update successful.")
+            else:
+                self._execute_query(update_ubr_gql, update_vars)
+                logger.info("Progress update successful.")
 
             return True
         except Exception as e:
-            print(f"Error updating progress: {e}")
+            logger.error(f"Error updating progress: {e}")
             return False
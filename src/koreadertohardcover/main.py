@@ -47,36 +47,47 @@ def map_book(query, db_path):
 
     offset = 0
     limit = 10
+    # The page is only re-fetched and re-rendered after a page change or a
+    # mapping; other keystrokes just wait for the next key.
+    books = None
 
     while True:
-        # Fetch books
-        books, total_count = db.get_local_books(query, limit, offset)
-
-        if not books:
-            console.print("[yellow]No local books found matching criteria.[/yellow]")
-            return
+        if books is None:
+            # Fetch books
+            books, total_count = db.get_local_books(query, limit, offset)
+
+            if not books:
+                console.print(
+                    "[yellow]No local books found matching criteria.[/yellow]"
+                )
+                return
+
+            # Display table
+            table = Table(
+                title=f"Local Books ({offset + 1}-{min(offset + len(books), total_count)} of {total_count})"
+            )
+            table.add_column("#", style="cyan", no_wrap=True)
+            table.add_column("Title", style="white")
+            table.add_column("Author", style="dim")
+            table.add_column("Last Read", style="blue")
+            table.add_column("Status", style="green")
+
+            for idx, (b_id, title, author, last_open, is_mapped, *_) in enumerate(
+                books, 1
+            ):
+                status = "[green]Mapped[/green]" if is_mapped else "[red]Unmapped[/red]"
+                last_read_str = str(last_open) if last_open else "Never"
+                table.add_row(
+                    str(idx), title, author or "Unknown", last_read_str, status
+                )
+
+            console.print(table)
+
+            # Prompt
+            console.print(
+                "\n[bold]Options:[/bold] [cyan]1-9, 0[/cyan] Select (0=10) | [cyan]n[/cyan]ext | [cyan]p[/cyan]revious | [cyan]q[/cyan]uit"
+            )
 
-        # Display table
-        table = Table(
-            title=f"Local Books ({offset + 1}-{min(offset + len(books), total_count)} of {total_count})"
-        )
-        table.add_column("#", style="cyan", no_wrap=True)
-        table.add_column("Title", style="white")
-        table.add_column("Author", style="dim")
-        table.add_column("Last Read", style="blue")
-        table.add_column("Status", style="green")
-
-        for idx, (b_id, title, author, last_open, is_mapped, *_) in enumerate(books, 1):
-            status = "[green]Mapped[/green]" if is_mapped else "[red]Unmapped[/red]"
-            last_read_str = str(last_open) if last_open else "Never"
-            table.add_row(str(idx), title, author or "Unknown", last_read_str, status)
-
-        console.print(table)
-
-        # Prompt
-        console.print(
-            "\n[bold]Options:[/bold] [cyan]1-9, 0[/cyan] Select (0=10) | [cyan]n[/cyan]ext | [cyan]p[/cyan]revious | [cyan]q[/cyan]uit"
-        )
         choice = click.getchar()
 
         if choice.lower() == "q":
@@ -84,11 +95,13 @@ def map_book(query, db_path):
         elif choice.lower() == "n":
             if offset + limit < total_count:
                 offset += limit
+                books = None
             else:
                 console.print("[yellow]Already on last page.[/yellow]")
         elif choice.lower() == "p":
             if offset - limit >= 0:
                 offset -= limit
+                books = None
             else:
                 console.print("[yellow]Already on first page.[/yellow]")
         else:
@@ -109,6 +122,8 @@ def map_book(query, db_path):
                     click.prompt(
                         "\nPress Enter to continue", default="", show_default=False
                     )
+                    # Mapping status changed, re-render the page
+                    books = None
                 else:
                     console.print("[red]Invalid selection.[/red]")
             except ValueError:
@@ -136,7 +151,7 @@ def map_book(query, db_path):
 @click.option(
     "--force",
     is_flag=True,
-    help="Force update even if progress/status matches Hardcover.",
+    help="Force update even if the book is already synced or progress/status matches Hardcover.",
 )
 def sync(sqlite_path, db_path, ingest_only, reset_db, past, force):
     """
@@ -173,15 +188,11 @@ def sync(sqlite_path, db_path, ingest_only, reset_db, past, force):
                 click.echo(click.style(f'  Failed to sync "{title}".', fg="red"))
 
     # 3. Summary
-    db = DatabaseManager(db_path)
-    with db.get_connection() as conn:
-        books_count_row = conn.execute("SELECT count(*) FROM books").fetchone()
-        books_count = books_count_row[0] if books_count_row else 0
-
-        sessions_count_row = conn.execute(
-            "SELECT count(*) FROM reading_sessions"
+    # Reuse the engine's database connection, both counts in one query
+    with engine.db.get_connection() as conn:
+        books_count, sessions_count = conn.execute(
+            "SELECT (SELECT count(*) FROM books), (SELECT count(*) FROM reading_sessions)"
         ).fetchone()
-        sessions_count = sessions_count_row[0] if sessions_count_row else 0
 
         click.echo(
             click.style(
@@ -16,8 +16,11 @@ from contextlib import asynccontextmanager
 import os
 import logging
 from logging.handlers import RotatingFileHandler
+import dataclasses
 import datetime
 import secrets
+import threading
+from typing import Optional
 
 from koreadertohardcover.engine import SyncEngine
 from koreadertohardcover.config import Config
@@ -48,33 +51,53 @@ engine = SyncEngine(db_path=db_path, config=config)
 templates = Jinja2Templates(
     directory=os.path.join(os.path.dirname(__file__), "templates")
 )
+# Templates ship with the package, so skip Jinja's per-render mtime check of
+# the cached templates (restart the server after editing them).
+templates.env.auto_reload = False
+
+# Shared Hardcover client, created on first use so the app still starts
+# without a token. Keeps its HTTP connections and rate limit across requests.
+_hardcover_client: Optional[HardcoverClient] = None
+_hardcover_client_lock = threading.Lock()
+
 
 # Global Sync Status
-sync_status = {
-    "state": "idle",  # idle, running
-    "last_run": None,
-    "last_result": None,
-}
+@dataclasses.dataclass(frozen=True, slots=True)
+class SyncStatus:
+    """
+    Snapshot of the background sync. It is replaced as a whole on every
+    change, so handlers never render a half-updated status.
+    """
+
+    state: str = "idle"  # idle, running
+    last_run: Optional[str] = None
+    last_result: Optional[str] = None
+
+
+sync_status = SyncStatus()
 
 # Scheduler
 scheduler = BackgroundScheduler()
+# Held while a sync runs, so a manual trigger never overlaps a scheduled run
+_sync_lock = threading.Lock()
 
 # Security
 security = HTTPBasic()
+# Expected Basic Auth credentials, read and encoded once at startup
+_correct_username_bytes = os.getenv("APP_USERNAME", "admin").encode("utf8")
+_correct_password_bytes = os.getenv("APP_PASSWORD", "admin").encode("utf8")
 
 
 def get_current_username(credentials: HTTPBasicCredentials = Depends(security)):
     """Verify Basic Auth credentials."""
     current_username_bytes = credentials.username.encode("utf8")
-    correct_username_bytes = os.getenv("APP_USERNAME", "admin").encode("utf8")
     is_correct_username = secrets.compare_digest(
-        current_username_bytes, correct_username_bytes
+        current_username_bytes, _correct_username_bytes
     )
 
     current_password_bytes = credentials.password.encode("utf8")
-    correct_password_bytes = os.getenv("APP_PASSWORD", "admin").encode("utf8")
     is_correct_password = secrets.compare_digest(
-        current_password_bytes, correct_password_bytes
+        current_password_bytes, _correct_password_bytes
     )
 
     if not (is_correct_username and is_correct_password):
@@ -119,43 +142,84 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     scheduler.shutdown()
+    if _hardcover_client is not None:
+        _hardcover_client.close()
 
 
 app = FastAPI(lifespan=lifespan, dependencies=[Depends(get_current_username)])
+# Only generate a random key when none is configured (sessions then do not
+# survive a restart). An empty SECRET_KEY counts as not configured.
 app.add_middleware(
-    SessionMiddleware, secret_key=os.getenv("SECRET_KEY", secrets.token_hex(32))
+    SessionMiddleware, secret_key=os.getenv("SECRET_KEY") or secrets.token_hex(32)
 )
 
 # --- Helpers ---
 
 
+def get_hardcover_client() -> HardcoverClient:
+    """Returns the shared HardcoverClient, creating it on first use."""
+    global _hardcover_client
+    with _hardcover_client_lock:
+        if _hardcover_client is None:
+            _hardcover_client = HardcoverClient(config)
+        return _hardcover_client
+
+
 def scheduled_sync():
     """Background task to ingest and sync."""
     global sync_status
-    sync_status["state"] = "running"
+    if not _sync_lock.acquire(blocking=False):
+        logger.info("Sync already running, skipping.")
+        return
+
+    sync_status = dataclasses.replace(sync_status, state="running")
 
     logger.info("Running scheduled sync...")
+    last_result = None
     try:
         if config.WEBDAV_URL:
             engine.ingest_from_webdav()
 
         engine.sync_progress(limit=20)
-        sync_status["last_result"] = "Success"
+        last_result = "Success"
     except Exception as e:
         logger.error(f"Sync failed: {e}")
-        sync_status["last_result"] = f"Error: {str(e)}"
+        last_result = f"Error: {str(e)}"
     finally:
-        sync_status["state"] = "idle"
-        sync_status["last_run"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        sync_status = SyncStatus(
+            state="idle",
+            last_run=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            last_result=last_result,
+        )
+        _sync_lock.release()
 
     logger.info("Scheduled sync complete.")
 
 
+def _tail_lines(path: str, count: int, block_size: int = 64 * 1024) -> list[str]:
+    """Returns the last `count` lines of a file, reading it backwards in blocks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        # One extra newline guarantees the first, possibly partial, line is cut
+        while pos > 0 and data.count(b"\n") <= count:
+            read = min(block_size, pos)
+            pos -= read
+            f.seek(pos)
+            data = f.read(read) + data
+
+    lines = data.decode("utf-8", errors="replace").splitlines(keepends=True)
+    return lines[-count:]
+
+
 # --- Routes ---
+# Handlers that touch DuckDB, the Hardcover API or the log file are plain
+# `def`, so FastAPI runs them in its threadpool instead of blocking the loop.
 
 
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, page: int = 1):
+def dashboard(request: Request, page: int = 1):
     """Main Dashboard."""
     message = request.session.pop("message", None)
     message_type = request.session.pop("message_type", None)
@@ -164,8 +228,7 @@ async def dashboard(request: Request, page: int = 1):
     username = request.session.get("hardcover_username")
     if not username and config.HARDCOVER_BEARER_TOKEN:
         try:
-            hc = HardcoverClient(config)
-            me = hc.get_me()
+            me = get_hardcover_client().get_me()
             username = me.get("username")
             if username:
                 request.session["hardcover_username"] = username
@@ -180,54 +243,28 @@ async def dashboard(request: Request, page: int = 1):
     # Prepare book objects for template
     book_list = []
     for b in books:
-        # b = (id, title, authors, last_open, is_mapped, hardcover_slug, hardcover_id)
+        # b = (id, title, authors, last_open, is_mapped, hardcover_slug,
+        #      hardcover_id, total_read_pages, total_pages, sync_status)
         book_list.append(
             {
                 "id": b[0],
                 "title": b[1],
                 "author": b[2],
-                # We need to fetch read pages / total pages for the progress bar
-                # This requires a separate query or updating get_local_books to return more data
-                # For now, let's just do a quick fetch or update the DB query later.
-                # To keep it simple, I'll update get_local_books in database.py to return full objects
-                # Or just fetch detail here.
                 "last_read": b[3],
                 "is_mapped": bool(b[4]),
                 "hardcover_slug": b[5],
                 "hardcover_id": b[6],
-                # Hack: We need read/total pages.
-                # Let's just fetch it individually for now or update the main query.
-                # Updating the main query is better but let's stick to existing for a sec.
+                "read_pages": b[7],
+                "total_pages": b[8],
+                "sync_status": b[9],
             }
         )
 
-    # Re-fetch with details for display (Efficiency improvement needed later)
-    # Actually, let's just update the query in database.py to return what we need.
-    # But I can't modify database.py right now in this step easily without context.
-    # So I will fetch details manually.
-
-    detailed_books = []
-    with engine.db.get_connection() as conn:
-        for b in book_list:
-            row = conn.execute(
-                "SELECT total_read_pages, total_pages, sync_status FROM books WHERE id = ?",
-                [b["id"]],
-            ).fetchone()
-            if row:
-                b["read_pages"] = row[0]
-                b["total_pages"] = row[1]
-                b["sync_status"] = row[2]
-            else:
-                b["read_pages"] = 0
-                b["total_pages"] = 0
-                b["sync_status"] = "unknown"
-            detailed_books.append(b)
-
     return templates.TemplateResponse(
         "dashboard.html",
         {
             "request": request,
-            "books": detailed_books,
+            "books": book_list,
             "page": page,
             "limit": limit,
             "total_count": total_count,
@@ -242,6 +279,12 @@ async def dashboard(request: Request, page: int = 1):
 @app.post("/sync")
 async def trigger_sync(request: Request, background_tasks: BackgroundTasks):
     """Manual Sync Trigger."""
+    # scheduled_sync would skip silently, so tell the user instead
+    if _sync_lock.locked():
+        request.session["message"] = "Sync already in progress"
+        request.session["message_type"] = "warning"
+        return RedirectResponse(url="/", status_code=303)
+
     background_tasks.add_task(scheduled_sync)
     request.session["message"] = "Sync started in background"
     request.session["message_type"] = "success"
@@ -249,14 +292,10 @@ async def trigger_sync(request: Request, background_tasks: BackgroundTasks):
 
 
 @app.get("/logs", response_class=HTMLResponse)
-async def view_logs(request: Request):
+def view_logs(request: Request):
     """View application logs."""
     if os.path.exists(log_path):
-        with open(log_path, "r") as f:
-            # Efficiently read last lines would be better for huge files,
-            # but for now standard readlines is okay for a simple tool
-            lines = f.readlines()
-            recent_logs = "".join(reversed(lines[-1000:]))
+        recent_logs = "".join(reversed(_tail_lines(log_path, 1000)))
     else:
         recent_logs = "No logs found."
 
@@ -266,7 +305,7 @@ async def view_logs(request: Request):
 
 
 @app.get("/map/{book_id}", response_class=HTMLResponse)
-async def map_book_ui(request: Request, book_id: str):
+def map_book_ui(request: Request, book_id: str):
     """Mapping Interface - Search."""
     with engine.db.get_connection() as conn:
         book_row = conn.execute(
@@ -291,7 +330,7 @@ async def map_book_ui(request: Request, book_id: str):
 
 
 @app.post("/map/{book_id}/search", response_class=HTMLResponse)
-async def map_book_search(request: Request, book_id: str, query: str = Form(...)):
+def map_book_search(request: Request, book_id: str, query: str = Form(...)):
     """Handle Search."""
     with engine.db.get_connection() as conn:
         book_row = conn.execute(
@@ -309,11 +348,9 @@ async def map_book_search(request: Request, book_id: str, query: str = Form(...)
         "total_pages": book_row[2],
     }
 
-    hc = HardcoverClient(config)
-
     # 1. Search Shelf (if query matches title roughly) - Optional optimization
     # 2. Global Search
-    results = hc.search_books(query)
+    results = get_hardcover_client().search_books(query)
 
     return templates.TemplateResponse(
         "mapping.html",
@@ -327,7 +364,7 @@ async def map_book_search(request: Request, book_id: str, query: str = Form(...)
 
 
 @app.post("/map/{book_id}/select", response_class=HTMLResponse)
-async def map_book_select(
+def map_book_select(
     request: Request,
     book_id: str,
     hardcover_id: str = Form(...),
@@ -336,15 +373,13 @@ async def map_book_select(
     slug: str = Form(None),
 ):
     """Handle Book Selection -> Show Editions."""
-    hc = HardcoverClient(config)
-
     with engine.db.get_connection() as conn:
         local_book_row = conn.execute(
             "SELECT total_pages FROM books WHERE id = ?", [book_id]
         ).fetchone()
         local_pages = local_book_row[0] if local_book_row else 0
 
-    editions = hc.get_editions(int(hardcover_id))
+    editions = get_hardcover_client().get_editions(int(hardcover_id))
 
     return templates.TemplateResponse(
         "editions.html",
@@ -362,7 +397,7 @@ async def map_book_select(
 
 
 @app.post("/map/{book_id}/confirm")
-async def map_book_confirm(
+def map_book_confirm(
     request: Request,
     book_id: str,
     hardcover_id: str = Form(...),
@@ -1,23 +1,41 @@
+from typing import Optional, Tuple
 from webdav4.client import Client
 from koreadertohardcover.config import Config
 
 
-def fetch_koreader_db(config: Config, local_path: str, remote_path: str = None) -> None:
-    """
-    Downloads the KOReader database from WebDAV.
-    """
+def _get_client(config: Config) -> Client:
+    """Builds a WebDAV client from the configuration."""
     if not config.WEBDAV_URL:
         raise ValueError("WEBDAV_URL is not set in configuration")
 
-    remote_path = remote_path or config.KOREADER_DB_PATH
-
     # Ensure URL starts with http:// or https:// if not already
     base_url = config.WEBDAV_URL
     if not base_url.startswith(("http://", "https://")):
         base_url = f"https://{base_url}"
 
-    client = Client(
+    return Client(
         base_url=base_url, auth=(config.WEBDAV_USERNAME, config.WEBDAV_PASSWORD)
     )
 
+
+def fetch_koreader_db(config: Config, local_path: str, remote_path: str = None) -> None:
+    """
+    Downloads the KOReader database from WebDAV.
+    """
+    client = _get_client(config)
+    remote_path = remote_path or config.KOREADER_DB_PATH
+
     client.download_file(from_path=remote_path, to_path=local_path)
+
+
+def get_koreader_db_version(config: Config, remote_path: str = None) -> Optional[Tuple]:
+    """
+    Returns (etag, modified, content_length) for the remote KOReader database,
+    or None if the server reports none of them.
+    """
+    client = _get_client(config)
+    remote_path = remote_path or config.KOREADER_DB_PATH
+
+    info = client.info(remote_path)
+    version = (info.get("etag"), info.get("modified"), info.get("content_length"))
+    return version if any(v is not None for v in version) else None
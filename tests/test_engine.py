@@ -25,6 +25,16 @@ def mock_db_manager():
         yield db_instance
 
 
+@pytest.fixture(autouse=True)
+def mock_webdav_version():
+    # Keep ingest_from_webdav from checking a real WebDAV server
+    with patch(
+        "koreadertohardcover.engine.get_koreader_db_version",
+        return_value=('"etag-1"', "2023-01-01", 1024),
+    ) as mock_version:
+        yield mock_version
+
+
 @pytest.fixture
 def engine(mock_config, mock_db_manager):
     # Pass path explicitly to avoid real file creation
@@ -38,8 +48,29 @@ def test_ingest_from_webdav_success(engine):
         assert success is True
         mock_fetch.assert_called_once()
         # Verify DB imports called
-        engine.db.import_books.assert_called_once()
-        engine.db.import_sessions.assert_called_once()
+        engine.db.import_all.assert_called_once()
+
+
+def test_ingest_from_webdav_skips_unchanged_file(engine, mock_webdav_version):
+    with patch("koreadertohardcover.engine.fetch_koreader_db") as mock_fetch:
+        assert engine.ingest_from_webdav() is True
+        assert engine.ingest_from_webdav() is True
+        # Second run sees the same version and skips download + import
+        mock_fetch.assert_called_once()
+        engine.db.import_all.assert_called_once()
+
+        mock_webdav_version.return_value = ('"etag-2"', "2023-01-02", 2048)
+        assert engine.ingest_from_webdav() is True
+        assert mock_fetch.call_count == 2
+
+
+def test_ingest_from_webdav_version_check_fails(engine, mock_webdav_version):
+    mock_webdav_version.side_effect = Exception("PROPFIND failed")
+    with patch("koreadertohardcover.engine.fetch_koreader_db") as mock_fetch:
+        assert engine.ingest_from_webdav() is True
+        assert engine.ingest_from_webdav() is True
+        # Without a version every run downloads
+        assert mock_fetch.call_count == 2
 
 
 def test_ingest_from_webdav_no_url(engine):
@@ -48,15 +79,12 @@ def test_ingest_from_webdav_no_url(engine):
     assert success is False
 
 
-def test_ingest_from_local_success(engine, tmp_path):
-    fake_db = tmp_path / "stats.sqlite3"
-    fake_db.touch()
-
-    success = engine.ingest_from_local(str(fake_db))
+def test_ingest_from_local_success(engine):
+    with patch("koreadertohardcover.engine.os.path.exists", return_value=True):
+        success = engine.ingest_from_local("/fake/stats.sqlite3")
 
     assert success is True
-    engine.db.import_books.assert_called_with(str(fake_db))
-    engine.db.import_sessions.assert_called_with(str(fake_db))
+    engine.db.import_all.assert_called_with("/fake/stats.sqlite3")
 
 
 def test_ingest_from_local_missing_file(engine):
@@ -181,22 +209,83 @@ def test_sync_progress_success(MockHC, engine):
     )
 
     # Verify DB Updates (sync_status set to 'synced')
-    # execute is called 1 (select) + 3 (updates) = 4 times
-    assert conn.execute.call_count == 4
-    conn.execute.assert_any_call(
-        "UPDATE books SET sync_status = 'synced', updated_at = now() WHERE id = ?",
-        ["md5_1"],
-    )
+    # execute is called 1 (select) + 1 (batched update) = 2 times
+    assert conn.execute.call_count == 2
     conn.execute.assert_any_call(
-        "UPDATE books SET sync_status = 'synced', updated_at = now() WHERE id = ?",
-        ["md5_2"],
-    )
-    conn.execute.assert_any_call(
-        "UPDATE books SET sync_status = 'synced', updated_at = now() WHERE id = ?",
-        ["md5_3"],
+        "UPDATE books SET sync_status = 'synced', updated_at = now() WHERE id = ANY(?)",
+        [["md5_1", "md5_2", "md5_3"]],
     )
 
 
+@pytest.fixture
+def db_engine(mock_config):
+    # Real in-memory DuckDB, for tests that depend on the sync query itself
+    engine = SyncEngine(db_path=":memory:", config=mock_config)
+    with engine.db.get_connection() as conn:
+        # Two local copies mapped to the same Hardcover book
+        conn.execute("""
+            INSERT INTO books (id, title, authors, total_read_pages, total_pages,
+                               status, total_read_time, last_open) VALUES
+                ('md5_new', 'Copy New', 'A', 80, 100, 'reading', 60, '2023-02-01'),
+                ('md5_old', 'Copy Old', 'A', 20, 100, 'reading', 60, '2023-01-01')
+        """)
+        conn.execute("""
+            INSERT INTO book_mappings (local_book_id, hardcover_id) VALUES
+                ('md5_new', '1001'),
+                ('md5_old', '1001')
+        """)
+    return engine
+
+
+@patch("koreadertohardcover.engine.HardcoverClient")
+def test_sync_progress_skips_duplicate_hardcover_books(MockHC, db_engine):
+    hc_instance = MockHC.return_value
+    hc_instance.update_progress.return_value = True
+
+    results = db_engine.sync_progress(limit=10)
+
+    assert results == [("Copy New", True)]
+    hc_instance.update_progress.assert_called_once()
+    assert hc_instance.update_progress.call_args.args[:2] == ("1001", 80)
+
+
+@patch("koreadertohardcover.engine.HardcoverClient")
+def test_sync_progress_older_pending_copy_does_not_override_newer(MockHC, db_engine):
+    hc_instance = MockHC.return_value
+    hc_instance.update_progress.return_value = True
+    with db_engine.db.get_connection() as conn:
+        conn.execute("UPDATE books SET sync_status = 'synced' WHERE id = 'md5_new'")
+
+    results = db_engine.sync_progress(limit=10)
+
+    # The newest copy is already synced, so nothing is pushed at all
+    assert results == []
+    hc_instance.update_progress.assert_not_called()
+
+
+@patch("koreadertohardcover.engine.HardcoverClient")
+def test_sync_progress_marks_synced_books_when_one_fails(MockHC, db_engine):
+    hc_instance = MockHC.return_value
+
+    def update_progress(hc_id, *args, **kwargs):
+        if hc_id == "1002":
+            raise ValueError("invalid literal for int()")
+        return True
+
+    hc_instance.update_progress.side_effect = update_progress
+    with db_engine.db.get_connection() as conn:
+        conn.execute(
+            "UPDATE book_mappings SET hardcover_id = '1002' WHERE local_book_id = 'md5_old'"
+        )
+
+    results = db_engine.sync_progress(limit=10)
+
+    assert results == [("Copy New", True), ("Copy Old", False)]
+    with db_engine.db.get_connection() as conn:
+        rows = conn.execute("SELECT id, sync_status FROM books ORDER BY id").fetchall()
+    assert rows == [("md5_new", "synced"), ("md5_old", "pending")]
+
+
 def test_ingest_from_webdav_exception(engine):
     with patch(
         "koreadertohardcover.engine.fetch_koreader_db",
@@ -206,14 +295,12 @@ def test_ingest_from_webdav_exception(engine):
         assert success is False
 
 
-def test_ingest_from_local_exception(engine, tmp_path):
-    fake_db = tmp_path / "stats.sqlite3"
-    fake_db.touch()
-
-    # Mock db.import_books to raise exception
-    engine.db.import_books.side_effect = Exception("Import failed")
+def test_ingest_from_local_exception(engine):
+    # Mock db.import_all to raise exception
+    engine.db.import_all.side_effect = Exception("Import failed")
 
-    success = engine.ingest_from_local(str(fake_db))
+    with patch("koreadertohardcover.engine.os.path.exists", return_value=True):
+        success = engine.ingest_from_local("/fake/stats.sqlite3")
     assert success is False
 
 
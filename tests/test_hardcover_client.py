@@ -1,6 +1,8 @@
+import json
 import pytest
 import respx
 from httpx import Response
+from koreadertohardcover import hardcover_client
 from koreadertohardcover.hardcover_client import HardcoverClient
 from koreadertohardcover.config import Config
 
@@ -19,7 +21,7 @@ def client(config):
 
 @respx.mock
 def test_search_books(client):
-    respx.post("https://api.hardcover.app/v1/graphql").mock(
+    route = respx.post("https://api.hardcover.app/v1/graphql").mock(
         return_value=Response(
             200,
             json={
@@ -58,16 +60,31 @@ def test_search_books(client):
     assert results[0]["title"] == "Project Hail Mary"
     assert results[0]["author_name"] == "Andy Weir"
     assert results[0]["id"] == "123"
+    # Auth header is set once on the shared HTTP client
+    assert route.calls.last.request.headers["Authorization"] == "test_token"
+    # Query indentation is stripped before sending
+    sent_query = json.loads(route.calls.last.request.content)["query"]
+    assert (
+        sent_query
+        == "query SearchBooks($query: String!) { search(query: $query) { results } }"
+    )
 
 
 @respx.mock
 def test_update_progress(client):
     def mock_handler(request):
         content = request.read().decode("utf-8")
-        if "GetBookPages" in content:
-            return Response(200, json={"data": {"books_by_pk": {"pages": 100}}})
         if "GetUserBookInfo" in content:
-            return Response(200, json={"data": {"me": [{"user_books": []}]}})
+            return Response(
+                200,
+                json={
+                    "data": {
+                        "edition": None,
+                        "book": {"pages": 100},
+                        "me": [{"user_books": []}],
+                    }
+                },
+            )
         elif "GetNewUserBook" in content:
             return Response(
                 200,
@@ -83,13 +100,17 @@ def test_update_progress(client):
             return Response(200, json={"data": {"update_user_book": {"id": 999}}})
         return Response(404)
 
-    respx.post("https://api.hardcover.app/v1/graphql").mock(side_effect=mock_handler)
+    route = respx.post("https://api.hardcover.app/v1/graphql").mock(
+        side_effect=mock_handler
+    )
 
     # Passing string ID which client converts to int
     success = client.update_progress(
         book_id="123", percentage=51, status="reading", seconds=3600
     )
     assert success is True
+    # Info, CreateUserBook, GetNewUserBook, UpdateUBR
+    assert route.call_count == 4
 
 
 @respx.mock
@@ -97,14 +118,14 @@ def test_update_progress_skips_finished(client):
     # Test that we skip update if remote status is 3 (Finished)
     def mock_handler(request):
         content = request.read().decode("utf-8")
-        if "GetBookPages" in content:
-            return Response(200, json={"data": {"books_by_pk": {"pages": 100}}})
         if "GetUserBookInfo" in content:
             # Return status_id 3 (Finished)
             return Response(
                 200,
                 json={
                     "data": {
+                        "edition": None,
+                        "book": {"pages": 100},
                         "me": [
                             {
                                 "user_books": [
@@ -116,7 +137,7 @@ def test_update_progress_skips_finished(client):
                                     }
                                 ]
                             }
-                        ]
+                        ],
                     }
                 },
             )
@@ -135,3 +156,195 @@ def test_update_progress_skips_finished(client):
 
     # Should succeed (return True) but NOT call any mutations
     assert success is True
+
+
+@respx.mock
+def test_update_progress_sends_status_with_progress(client):
+    # Progress and a status change are written with one mutation request
+    def mock_handler(request):
+        content = request.read().decode("utf-8")
+        if "GetUserBookInfo" in content:
+            return Response(
+                200,
+                json={
+                    "data": {
+                        "edition": {"pages": 200},
+                        "book": {"pages": 100},
+                        "me": [
+                            {
+                                "user_books": [
+                                    {
+                                        "id": 999,
+                                        "status_id": 2,
+                                        "edition_id": 55,
+                                        "user_book_reads": [
+                                            {
+                                                "id": 888,
+                                                "progress_pages": 150,
+                                                "progress_seconds": 3000,
+                                                "started_at": None,
+                                                "finished_at": None,
+                                            }
+                                        ],
+                                    }
+                                ]
+                            }
+                        ],
+                    }
+                },
+            )
+        if "UpdateUBRAndUB" in content:
+            return Response(
+                200,
+                json={
+                    "data": {
+                        "update_user_book_read": {"id": 888},
+                        "update_user_book": {"id": 999},
+                    }
+                },
+            )
+        return Response(500, json={"error": "Unexpected request"})
+
+    route = respx.post("https://api.hardcover.app/v1/graphql").mock(
+        side_effect=mock_handler
+    )
+
+    success = client.update_progress(
+        book_id="123", percentage=100, status="finished", seconds=3600, edition_id="55"
+    )
+
+    assert success is True
+    assert route.call_count == 2
+    mutation = json.loads(route.calls.last.request.content)
+    # Edition page count takes precedence over the book's
+    assert mutation["variables"]["pages"] == 200
+    assert mutation["variables"]["status_id"] == 3
+
+
+@respx.mock
+def test_search_shelf_falls_back_to_case_insensitive_match(client):
+    shelf_book = {
+        "book": {
+            "id": 42,
+            "title": "100% Dune",
+            "slug": "dune",
+            "pages": 600,
+            "contributions": [{"author": {"name": "Frank Herbert"}}],
+        }
+    }
+
+    def mock_handler(request):
+        body = json.loads(request.read())
+        if "SearchShelfInsensitive" in body["query"]:
+            assert body["variables"] == {"title": "100\\% dune"}
+            return Response(200, json={"data": {"me": [{"user_books": [shelf_book]}]}})
+        return Response(200, json={"data": {"me": [{"user_books": []}]}})
+
+    route = respx.post("https://api.hardcover.app/v1/graphql").mock(
+        side_effect=mock_handler
+    )
+
+    results = client.search_shelf(" 100% dune ")
+    assert route.call_count == 2
+    assert results == [
+        {
+            "id": 42,
+            "title": "100% Dune",
+            "slug": "dune",
+            "author_name": "Frank Herbert",
+            "pages": 600,
+        }
+    ]
+
+
+@respx.mock
+def test_execute_query_retries_after_rate_limit(client, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(
+        "koreadertohardcover.hardcover_client.time.sleep", sleeps.append
+    )
+    route = respx.post("https://api.hardcover.app/v1/graphql").mock(
+        side_effect=[
+            Response(429, headers={"Retry-After": "2"}),
+            Response(200, json={"data": {"me": [{"id": 1}]}}),
+        ]
+    )
+
+    assert client.get_me() == {"id": 1}
+    assert route.call_count == 2
+    assert len(sleeps) == 1
+    assert 2 <= sleeps[0] <= 2.25
+
+
+def test_retry_delay_clamps_retry_after(client):
+    huge = Response(429, headers={"Retry-After": "3600"})
+    assert (
+        client.MAX_RETRY_DELAY
+        <= client._retry_delay(huge, attempt=0)
+        <= client.MAX_RETRY_DELAY + 0.25
+    )
+
+    # A negative value would make time.sleep raise
+    negative = Response(429, headers={"Retry-After": "-5"})
+    assert 0 <= client._retry_delay(negative, attempt=0) <= 0.25
+
+
+def test_rate_limit_waits_once_burst_is_spent(client, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(
+        "koreadertohardcover.hardcover_client.time.sleep", sleeps.append
+    )
+    monkeypatch.setattr(
+        "koreadertohardcover.hardcover_client.time.monotonic", lambda: 0.0
+    )
+    client._last_refill = 0.0
+
+    for _ in range(client.RATE_LIMIT_BURST):
+        client._wait_for_rate_limit()
+    assert sleeps == []
+
+    client._wait_for_rate_limit()
+    assert sleeps == [1.0]
+
+
+@respx.mock
+def test_get_editions_is_cached(client, config, monkeypatch):
+    route = respx.post("https://api.hardcover.app/v1/graphql").mock(
+        return_value=Response(
+            200,
+            json={
+                "data": {
+                    "editions": [
+                        {
+                            "id": 7,
+                            "title": "Dune",
+                            "pages": 600,
+                            "edition_format": "Paperback",
+                            "release_date": "1990-01-01",
+                            "language": {"language": "English"},
+                        }
+                    ]
+                }
+            },
+        )
+    )
+
+    # Repeated lookups (e.g. later web requests) reuse the cached editions
+    first = client.get_editions(42)
+    second = client.get_editions(42)
+    assert first == second
+    assert first[0]["language"] == "English"
+    assert route.call_count == 1
+
+    # The cache belongs to the client, so other clients fetch on their own
+    HardcoverClient(config).get_editions(42)
+    assert route.call_count == 2
+
+    # Expired entries are fetched again
+    monkeypatch.setattr(hardcover_client, "EDITIONS_CACHE_TTL", 0)
+    client.get_editions(42)
+    assert route.call_count == 3
+
+    # Storing a new entry evicts the expired ones
+    client.get_editions(43)
+    assert list(client._editions_cache) == [43]
@@ -1,5 +1,6 @@
 import pytest
 import os
+import sqlite3
 from koreadertohardcover.database import DatabaseManager
 
 
@@ -12,6 +13,37 @@ def db_manager(tmp_path):
     # manager.close()  <-- Removed
 
 
+@pytest.fixture
+def koreader_db(tmp_path):
+    """Fixture to create a minimal KOReader statistics database."""
+    sqlite_path = tmp_path / "statistics.sqlite3"
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute("""
+        CREATE TABLE book (
+            id INTEGER PRIMARY KEY, title TEXT, authors TEXT, notes INTEGER,
+            last_open INTEGER, highlights INTEGER, pages INTEGER, series TEXT,
+            language TEXT, md5 TEXT, total_read_time INTEGER,
+            total_read_pages INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE page_stat_data (
+            id_book INTEGER, page INTEGER, start_time INTEGER,
+            duration INTEGER, total_pages INTEGER
+        )
+    """)
+    conn.execute(
+        "INSERT INTO book VALUES (1, 'Book A', 'Author A', 0, 1700000000, 0, 100, '', 'en', 'md5_a', 600, 10)"
+    )
+    conn.executemany(
+        "INSERT INTO page_stat_data VALUES (1, ?, ?, 60, 100)",
+        [(page, 1700000000 + page * 60) for page in range(1, 11)],
+    )
+    conn.commit()
+    conn.close()
+    return str(sqlite_path)
+
+
 def test_ingestion_from_example(db_manager):
     """Tests ingestion from the known example SQLite file."""
     # Resolve path relative to this test file or project root
@@ -21,9 +53,8 @@ def test_ingestion_from_example(db_manager):
     if not os.path.exists(sqlite_path):
         pytest.skip(f"Example file not found at {sqlite_path}")
 
-    # Run Import
-    db_manager.import_books(sqlite_path)
-    db_manager.import_sessions(sqlite_path)
+    # Run Import (books and sessions in one attach and one transaction)
+    db_manager.import_all(sqlite_path)
 
     with db_manager.get_connection() as conn:
         # Verify Books
@@ -48,3 +79,37 @@ def test_ingestion_from_example(db_manager):
             WHERE b.id IS NULL
         """).fetchone()[0]
         assert orphaned_sessions == 0, "Found reading sessions without associated books"
+
+
+def test_reimport_skips_existing_sessions(db_manager, koreader_db):
+    """Importing the same KOReader database twice must not duplicate data."""
+    db_manager.import_all(koreader_db)
+    db_manager.import_books(koreader_db)
+    db_manager.import_sessions(koreader_db)
+
+    with db_manager.get_connection() as conn:
+        assert conn.execute("SELECT count(*) FROM books").fetchone()[0] == 1
+        assert conn.execute("SELECT count(*) FROM reading_sessions").fetchone()[0] == 10
+
+
+def test_reimport_resets_sync_status_on_progress(db_manager, koreader_db):
+    """Only books whose progress changed go back to 'pending'."""
+    db_manager.import_all(koreader_db)
+    with db_manager.get_connection() as conn:
+        conn.execute("UPDATE books SET sync_status = 'synced'")
+
+    # Unchanged import keeps the book synced
+    db_manager.import_all(koreader_db)
+    with db_manager.get_connection() as conn:
+        assert conn.execute("SELECT sync_status FROM books").fetchone()[0] == "synced"
+
+    sqlite_conn = sqlite3.connect(koreader_db)
+    sqlite_conn.execute(
+        "UPDATE book SET total_read_pages = 20, last_open = last_open + 60"
+    )
+    sqlite_conn.commit()
+    sqlite_conn.close()
+
+    db_manager.import_all(koreader_db)
+    with db_manager.get_connection() as conn:
+        assert conn.execute("SELECT sync_status FROM books").fetchone()[0] == "pending"
@@ -1,25 +1,25 @@
 import pytest
+from unittest.mock import MagicMock, patch
 from koreadertohardcover.database import DatabaseManager
+from koreadertohardcover.mapping import InteractiveMapper
 
 
-class TestDatabaseManager:
-    @pytest.fixture
-    def db(self, tmp_path):
-        db_path = tmp_path / "test_map.duckdb"
-        db = DatabaseManager(str(db_path))
-        # Seed test data
-        with db.get_connection() as conn:
-            conn.execute(
-                "INSERT INTO books (id, title, authors, last_open) VALUES ('1', 'Book A', 'Author A', '2023-01-01')"
-            )
-            conn.execute(
-                "INSERT INTO books (id, title, authors, last_open) VALUES ('2', 'Book B', 'Author B', '2023-01-02')"
-            )
-            conn.execute(
-                "INSERT INTO books (id, title, authors, last_open) VALUES ('3', 'Book C', 'Author C', '2023-01-03')"
-            )
-        return db
+@pytest.fixture
+def db():
+    # In-memory: each DatabaseManager owns its own fresh database
+    db = DatabaseManager(":memory:")
+    # Seed test data
+    with db.get_connection() as conn:
+        conn.execute("""
+            INSERT INTO books (id, title, authors, last_open) VALUES
+                ('1', 'Book A', 'Author A', '2023-01-01'),
+                ('2', 'Book B', 'Author B', '2023-01-02'),
+                ('3', 'Book C', 'Author C', '2023-01-03')
+        """)
+    return db
+
 
+class TestDatabaseManager:
     def test_get_local_books_all(self, db):
         books, count = db.get_local_books()
         assert count == 3
@@ -28,6 +28,8 @@ class TestDatabaseManager:
         assert books[0][1] == "Book C"
         assert books[1][1] == "Book B"
         assert books[2][1] == "Book A"
+        # Progress and sync columns for the dashboard come with the page
+        assert books[0][7:] == (None, None, "pending")
 
     def test_get_local_books_query(self, db):
         books, count = db.get_local_books(query="Book B")
@@ -56,3 +58,81 @@ class TestDatabaseManager:
         assert books[0][4] == 0
         # Book A (Oldest) - Mapped
         assert books[2][4] == 1
+
+    def test_save_book_mappings(self, db):
+        db.save_book_mapping("1", "100", title="Book A")
+        assert db.get_book_mapping("1") == ("100", None)
+
+        # Saving must invalidate the cached lookup above
+        db.save_book_mappings(
+            [
+                ("1", "101", "9001", "Book A", "Author A", "book-a"),
+                ("2", "200", None, "Book B", "Author B", "book-b"),
+            ]
+        )
+
+        assert db.get_book_mapping("1") == ("101", "9001")
+        assert db.get_book_mapping("2") == ("200", None)
+        assert db.get_book_mapping("3") is None
+
+    def test_save_book_mapping_resets_sync_status(self, db):
+        with db.get_connection() as conn:
+            conn.execute("UPDATE books SET sync_status = 'synced'")
+
+        db.save_book_mapping("1", "100")
+
+        with db.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, sync_status FROM books ORDER BY id"
+            ).fetchall()
+        assert rows == [("1", "pending"), ("2", "synced"), ("3", "synced")]
+
+
+class TestInteractiveMapper:
+    def test_map_book_search_different_title_on_remap(self, db):
+        db.save_book_mapping("1", "100", title="Book A")
+
+        client = MagicMock()
+        client.search_shelf.return_value = []
+        client.search_books.side_effect = [
+            [{"id": 150, "title": "Wrong", "author_name": "X"}],
+            [{"id": 200, "title": "Book A", "author_name": "Author A"}],
+        ]
+        client.get_editions.return_value = []
+        mapper = InteractiveMapper(client, db)
+
+        # Pick "search again", enter a new title, then take the first hit
+        with patch(
+            "koreadertohardcover.mapping.click.prompt",
+            side_effect=["s", "Book A (Novel)", "1"],
+        ):
+            result = mapper.map_book("1", "Book A", "Author A", force=True)
+
+        assert result == ("200", None)
+        client.search_books.assert_called_with("Book A (Novel)")
+        assert db.get_book_mapping("1") == ("200", None)
+
+    def test_map_book_defaults_to_closest_edition(self, db):
+        with db.get_connection() as conn:
+            conn.execute("UPDATE books SET total_pages = 200 WHERE id = '1'")
+
+        client = MagicMock()
+        client.search_shelf.return_value = []
+        client.search_books.return_value = [
+            {"id": 100, "title": "Book A", "author_name": "Author A"}
+        ]
+        client.get_editions.return_value = [
+            {"id": 1, "pages": 350},
+            {"id": 2, "pages": 197},
+            {"id": 3, "pages": 201},
+        ]
+        mapper = InteractiveMapper(client, db)
+
+        # Accept every default: first search hit, then the suggested edition
+        with patch(
+            "koreadertohardcover.mapping.click.prompt",
+            side_effect=lambda text, default=None, **kwargs: default,
+        ):
+            result = mapper.map_book("1", "Book A", "Author A")
+
+        assert result == ("100", "3")
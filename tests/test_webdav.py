@@ -1,6 +1,9 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from koreadertohardcover.webdav_client import fetch_koreader_db
+from koreadertohardcover.webdav_client import (
+    fetch_koreader_db,
+    get_koreader_db_version,
+)
 from koreadertohardcover.config import Config
 
 
@@ -36,3 +39,33 @@ def test_fetch_koreader_db_no_url():
     config.WEBDAV_URL = None
     with pytest.raises(ValueError, match="WEBDAV_URL is not set"):
         fetch_koreader_db(config, "local.db")
+
+
+@patch("koreadertohardcover.webdav_client.Client")
+def test_get_koreader_db_version(mock_client_cls):
+    mock_client = MagicMock()
+    mock_client_cls.return_value = mock_client
+    mock_client.info.return_value = {
+        "etag": '"abc"',
+        "modified": "2023-01-01",
+        "content_length": 1024,
+    }
+
+    config = Config()
+    config.WEBDAV_URL = "dav.example.com"
+    config.WEBDAV_USERNAME = "user"
+    config.WEBDAV_PASSWORD = "pass"
+
+    assert get_koreader_db_version(config, "statistics.sqlite3") == (
+        '"abc"',
+        "2023-01-01",
+        1024,
+    )
+    mock_client_cls.assert_called_with(
+        base_url="https://dav.example.com", auth=("user", "pass")
+    )
+    mock_client.info.assert_called_with("statistics.sqlite3")
+
+    # A server without any version metadata cannot be compared
+    mock_client.info.return_value = {"etag": None}
+    assert get_koreader_db_version(config, "statistics.sqlite3") is None